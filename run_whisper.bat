@@ -21,7 +21,7 @@ echo Activating virtual environment...
 call whisper_env\Scripts\activate.bat
 
 REM Check if whisper is installed
-python -c "import whisper" 2>nul
+python -c "import faster_whisper" 2>nul
 if errorlevel 1 (
     echo ERROR: Whisper not installed!
     echo Please run setup.bat first to install dependencies.
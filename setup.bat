@@ -22,25 +22,6 @@ echo Python found:
 python --version
 echo.
 
-REM Check FFmpeg installation
-ffmpeg -version >nul 2>&1
-if errorlevel 1 (
-    echo WARNING: FFmpeg not found!
-    echo FFmpeg is required for audio processing.
-    echo Please install FFmpeg and add it to PATH.
-    echo.
-    echo Installation options:
-    echo 1. Manual: Download from https://ffmpeg.org/download.html
-    echo 2. With Chocolatey: choco install ffmpeg
-    echo.
-    pause
-    exit /b 1
-)
-
-echo FFmpeg found:
-ffmpeg -version | findstr "version"
-echo.
-
 REM Create virtual environment
 echo Creating virtual environment...
 if exist "whisper_env" (
@@ -69,16 +50,12 @@ echo.
 echo Installing dependencies (this may take several minutes)...
 echo.
 
-echo [1/3] Installing PyTorch...
-pip install torch torchvision torchaudio
-
-echo.
-echo [2/3] Installing OpenAI Whisper...
-pip install openai-whisper
+echo [1/2] Installing faster-whisper...
+pip install faster-whisper
 
 echo.
-echo [3/3] Installing additional dependencies...
-pip install numpy
+echo [2/2] Installing additional dependencies...
+pip install numpy soundfile scipy
 
 echo.
 echo ========================================
@@ -95,7 +72,7 @@ echo.
 
 REM Test import
 echo Testing installation...
-python -c "import whisper; print('Whisper successfully installed!')"
+python -c "import faster_whisper; print('Whisper successfully installed!')"
 
 if errorlevel 1 (
     echo.
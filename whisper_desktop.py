@@ -1,6 +1,7 @@
 """
 Whisper Desktop Application
-A professional GUI application for audio transcription using OpenAI Whisper
+A professional GUI application for audio transcription using Whisper
+(faster-whisper / CTranslate2 backend)
 Supports both single file and batch processing
 """
 
@@ -10,11 +11,46 @@ import threading
 import queue
 import os
 import json
+import hashlib
+import re
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from math import gcd
 from pathlib import Path
-import whisper
+import av
+import ctranslate2
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class TranscriptionCancelled(Exception):
+    """Raised when the user stops processing while a file is being transcribed"""
 
 class WhisperDesktopApp:
+    # Bumped when transcription settings change the output for the same key
+    RESULT_CACHE_VERSION = 2
+    
+    # CTranslate2 compute types in the order the Quantization selector lists them
+    COMPUTE_TYPE_ORDER = ['int8', 'int8_float16', 'int8_bfloat16', 'int8_float32',
+                          'int16', 'float16', 'bfloat16', 'float32']
+    
+    # Approximate model weight footprint in MB by weight precision
+    MODEL_WEIGHT_MB = {
+        'tiny': {'int8': 40, 'float16': 75, 'float32': 150},
+        'base': {'int8': 75, 'float16': 145, 'float32': 290},
+        'small': {'int8': 245, 'float16': 485, 'float32': 970},
+        'medium': {'int8': 770, 'float16': 1530, 'float32': 3060},
+        'large': {'int8': 1550, 'float16': 3090, 'float32': 6170},
+    }
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Whisper Desktop - Audio Transcription Tool")
@@ -23,16 +59,52 @@ class WhisperDesktopApp:
         
         # Application state
         self.model = None
+        self.batched = None
+        self._model_cache = OrderedDict()
+        self._model_cache_lock = threading.Lock()
+        self.model_cache_size = 2
+        self._model_load_generation = 0
+        self._requested_model = None
         self.current_model_name = "base"
+        self.current_compute_type = "auto"
+        self.loaded_compute_type = None
+        self.device, self.auto_compute_type = self._detect_device()
+        
+        # CPU inference: intra-op threads per model worker, and workers to fill the cores
+        self.cpu_threads = 4
+        self.cpu_workers = max(1, (os.cpu_count() or 1) // self.cpu_threads)
         self.processing = False
+        self._cancel = threading.Event()
         self.processing_queue = queue.Queue()
-        self.audio_files = []
+        
+        # Transcription results cached by audio content and options
+        self.cache_dir = Path.home() / ".cache" / "whisper_desktop"
+        self._hash_index = None
+        self._hash_index_dirty = False
+        self._cache_lock = threading.Lock()
+        self.result_cache_max_mb = 200
+        
+        # Widget updates from worker threads, applied by the periodic _drain_ui tick
+        self._ui_queue = queue.Queue()
+        self.ui_drain_interval_ms = 50
+        self.ui_drain_limit = 500
+        
+        # Console keeps only the most recent log lines
+        self.console_max_lines = 2000
+        self._console_lines = 0
+        
+        # Batch files, one parallel list per attribute (indexes match batch tree rows)
+        self._files = {'path': [], 'size': [], 'duration': [], 'status': []}
+        self._audio_file_set = set()
         
         # Supported audio formats
         self.supported_formats = ('.mp3', '.wav', '.m4a', '.flac', '.ogg', '.opus', '.wma')
+        extensions = '|'.join(re.escape(fmt.lstrip('.')) for fmt in self.supported_formats)
+        self._fmt_re = re.compile(rf'\.(?:{extensions})$', re.IGNORECASE)
         
         # Setup UI
         self.setup_ui()
+        self._drain_ui()
         
         # Load default model in background
         self.load_model_async(self.current_model_name)
@@ -125,10 +197,27 @@ class WhisperDesktopApp:
                                     variable=self.word_timestamps_var)
         word_check.grid(row=1, column=2, columnspan=2, sticky=tk.W, pady=(10, 0))
         
+        # Quantization (CTranslate2 compute type)
+        ttk.Label(config_frame, text="Quantization:").grid(row=1, column=4, sticky=tk.W, pady=(10, 0), padx=(0, 10))
+        self.compute_type_var = tk.StringVar(value=self.current_compute_type)
+        self.compute_combo = ttk.Combobox(config_frame, textvariable=self.compute_type_var,
+                                          values=self._compute_type_choices(),
+                                          state='readonly', width=15)
+        self.compute_combo.grid(row=1, column=5, sticky=tk.W, pady=(10, 0))
+        self.compute_combo.bind('<<ComboboxSelected>>', self.on_model_change)
+        
+        self.memory_estimate_label = ttk.Label(config_frame, foreground='gray')
+        self.memory_estimate_label.grid(row=1, column=6, sticky=tk.W, pady=(10, 0), padx=(10, 0))
+        self.update_memory_estimate()
+        
         # Model status
         self.model_status_label = ttk.Label(config_frame, text="Model Status: Loading base model...",
                                            foreground='blue')
         self.model_status_label.grid(row=2, column=0, columnspan=6, sticky=tk.W, pady=(10, 0))
+        
+        self.clear_cache_btn = ttk.Button(config_frame, text="🧹 Clear Cache",
+                                         command=self.clear_result_cache)
+        self.clear_cache_btn.grid(row=2, column=6, sticky=tk.E, pady=(10, 0))
     
     def create_mode_tabs(self, parent):
         """Create tabbed interface for single and batch mode"""
@@ -190,12 +279,20 @@ class WhisperDesktopApp:
         controls_frame = ttk.Frame(parent)
         controls_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
         
-        ttk.Button(controls_frame, text="➕ Add Files", 
-                  command=self.add_batch_files).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(controls_frame, text="📁 Add Folder", 
-                  command=self.add_batch_folder).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(controls_frame, text="🗑️ Clear All", 
-                  command=self.clear_batch_files).pack(side=tk.LEFT, padx=(0, 20))
+        self.add_files_btn = ttk.Button(controls_frame, text="➕ Add Files", 
+                                        command=self.add_batch_files)
+        self.add_files_btn.pack(side=tk.LEFT, padx=(0, 5))
+        self.add_folder_btn = ttk.Button(controls_frame, text="📁 Add Folder", 
+                                         command=self.add_batch_folder)
+        self.add_folder_btn.pack(side=tk.LEFT, padx=(0, 5))
+        self.clear_btn = ttk.Button(controls_frame, text="🗑️ Clear All", 
+                                    command=self.clear_batch_files)
+        self.clear_btn.pack(side=tk.LEFT, padx=(0, 20))
+        
+        ttk.Label(controls_frame, text="Batch Size:").pack(side=tk.LEFT, padx=(0, 10))
+        self.batch_size_var = tk.IntVar(value=16)
+        ttk.Spinbox(controls_frame, from_=1, to=64, textvariable=self.batch_size_var,
+                    width=5).pack(side=tk.LEFT, padx=(0, 20))
         
         ttk.Label(controls_frame, text="Output Folder:").pack(side=tk.LEFT, padx=(0, 10))
         self.batch_output_var = tk.StringVar(value=str(Path.home() / "Documents" / "Whisper_Output"))
@@ -230,10 +327,17 @@ class WhisperDesktopApp:
         self.batch_tree.configure(yscrollcommand=scrollbar.set)
         
         # Batch process button
-        self.batch_process_btn = ttk.Button(parent, text="🚀 Process All Files",
+        buttons_frame = ttk.Frame(parent)
+        buttons_frame.grid(row=2, column=0, pady=(0, 0))
+        
+        self.batch_process_btn = ttk.Button(buttons_frame, text="🚀 Process All Files",
                                            command=self.process_batch_files,
                                            style='Accent.TButton')
-        self.batch_process_btn.grid(row=2, column=0, pady=(0, 0))
+        self.batch_process_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.batch_stop_btn = ttk.Button(buttons_frame, text="⏹️ Stop",
+                                        command=self.stop_processing, state='disabled')
+        self.batch_stop_btn.pack(side=tk.LEFT)
     
     def create_progress_panel(self, parent):
         """Create progress and status panel"""
@@ -262,7 +366,7 @@ class WhisperDesktopApp:
         
         self.console = scrolledtext.ScrolledText(console_frame, height=8, wrap=tk.WORD,
                                                 background='#1e1e1e', foreground='#d4d4d4',
-                                                font=('Consolas', 9))
+                                                font=('Consolas', 9), state='disabled')
         self.console.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         self.log("Application initialized successfully")
@@ -271,8 +375,9 @@ class WhisperDesktopApp:
     
     def on_model_change(self, event):
         """Handle model selection change"""
+        self.update_memory_estimate()
         new_model = self.model_var.get()
-        if new_model != self.current_model_name:
+        if (new_model, self.compute_type_var.get()) != self._requested_model:
             self.load_model_async(new_model)
     
     def browse_single_file(self):
@@ -310,12 +415,11 @@ class WhisperDesktopApp:
             ]
         )
         
-        for filename in filenames:
-            if filename not in self.audio_files:
-                self.audio_files.append(filename)
-                size = os.path.getsize(filename)
-                size_mb = f"{size / (1024*1024):.2f} MB"
-                self.batch_tree.insert('', 'end', values=(os.path.basename(filename), size_mb, 'Pending'))
+        self._add_batch_files([
+            (filename, os.path.getsize(filename))
+            for filename in filenames
+            if filename not in self._audio_file_set
+        ])
         
         self.log(f"Added {len(filenames)} file(s) to batch queue")
     
@@ -323,49 +427,254 @@ class WhisperDesktopApp:
         """Add all audio files from a folder"""
         folder = filedialog.askdirectory(title="Select Folder with Audio Files")
         if folder:
-            count = 0
-            for root, dirs, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith(self.supported_formats):
-                        filepath = os.path.join(root, file)
-                        if filepath not in self.audio_files:
-                            self.audio_files.append(filepath)
-                            size = os.path.getsize(filepath)
-                            size_mb = f"{size / (1024*1024):.2f} MB"
-                            self.batch_tree.insert('', 'end', values=(os.path.basename(filepath), size_mb, 'Pending'))
-                            count += 1
+            entries = [
+                (filepath, size)
+                for filepath, size in self._scan_audio_files(folder)
+                if filepath not in self._audio_file_set
+            ]
+            self._add_batch_files(entries)
             
-            self.log(f"Added {count} file(s) from folder: {folder}")
+            self.log(f"Added {len(entries)} file(s) from folder: {folder}")
+    
+    def _scan_audio_files(self, folder):
+        """Recursively yield (path, size) for supported audio files under folder"""
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            # Unreadable folders are skipped, as os.walk does
+            return
+        
+        subfolders = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                elif entry.is_file() and self._fmt_re.search(entry.name):
+                    yield entry.path, entry.stat().st_size
+            except OSError:
+                # Entries deleted or denied mid-scan are skipped individually
+                continue
+        
+        for subfolder in subfolders:
+            yield from self._scan_audio_files(subfolder)
+    
+    def _add_batch_files(self, entries):
+        """Append (path, size) entries to the batch columns and the batch tree"""
+        paths = [filepath for filepath, _ in entries]
+        self._files['path'].extend(paths)
+        self._audio_file_set.update(paths)
+        self._files['size'].extend(size for _, size in entries)
+        # Durations are probed when a batch starts, off the Tk thread
+        self._files['duration'].extend(None for _ in paths)
+        self._files['status'].extend('Pending' for _ in paths)
+        
+        if not entries:
+            return
+        
+        # Unmap the tree while inserting so Tk lays it out once instead of per row
+        self.batch_tree.grid_remove()
+        try:
+            for filepath, size in entries:
+                size_mb = f"{size / (1024*1024):.2f} MB"
+                item = self.batch_tree.insert('', 'end', values=(os.path.basename(filepath), size_mb, 'Pending'))
+        finally:
+            self.batch_tree.grid()
+        
+        self.batch_tree.see(item)
+        self.root.update_idletasks()
+    
+    @staticmethod
+    def _probe_duration(filepath):
+        """Read audio duration in seconds from the file header, or 0.0 if unknown"""
+        try:
+            return sf.info(filepath).duration
+        except RuntimeError:
+            pass
+        
+        # Formats libsndfile cannot parse (m4a, wma, ...) report it through PyAV
+        try:
+            with av.open(filepath) as container:
+                if container.duration is not None:
+                    return container.duration / av.time_base
+        except (av.error.FFmpegError, OSError):
+            pass
+        return 0.0
     
     def clear_batch_files(self):
         """Clear all files from batch list"""
-        self.audio_files.clear()
+        for column in self._files.values():
+            column.clear()
+        self._audio_file_set.clear()
         for item in self.batch_tree.get_children():
             self.batch_tree.delete(item)
         self.log("Cleared batch file list")
     
     # Processing Functions
     
+    @staticmethod
+    def _detect_device():
+        """Pick the inference device and default compute type for this machine"""
+        if ctranslate2.get_cuda_device_count() > 0:
+            # CTranslate2 only reports int8_float16 on GPUs with fast INT8/FP16 kernels
+            supported = ctranslate2.get_supported_compute_types('cuda')
+            if 'int8_float16' in supported:
+                return 'cuda', 'int8_float16'
+            if 'float16' in supported:
+                return 'cuda', 'float16'
+            return 'cuda', 'float32'
+        return 'cpu', 'int8'
+    
     def load_model_async(self, model_name):
         """Load Whisper model in background thread"""
+        selected_compute_type = self.compute_type_var.get()
+        device = self.device
+        compute_type = self._resolve_compute_type(selected_compute_type)
+        cache_key = (model_name, device, compute_type)
+        
+        # Loads that finish after a newer selection are cached but not made active
+        self._requested_model = (model_name, selected_compute_type)
+        self._model_load_generation += 1
+        generation = self._model_load_generation
+        
+        # Switching back to a recently used model reuses the resident instance
+        with self._model_cache_lock:
+            cached_model = self._model_cache.get(cache_key)
+            if cached_model is not None:
+                self._model_cache.move_to_end(cache_key)
+        
+        if cached_model is not None:
+            self._bind_model(cached_model, model_name, selected_compute_type, compute_type)
+            self.model_status_label.config(
+                text=f"Model Status: {model_name} loaded ✓ ({device}, {compute_type})",
+                foreground='green')
+            self.log(f"{model_name} model restored from cache")
+            return
+        
         self.model_status_label.config(text=f"Loading {model_name} model...", foreground='orange')
-        self.log(f"Loading {model_name} model...")
+        self.log(f"Loading {model_name} model ({device}, {compute_type})...")
+        
+        def show_warm_up():
+            if generation == self._model_load_generation:
+                self.model_status_label.config(
+                    text=f"Warming up {model_name} model...", foreground='orange')
+        
+        def create_model(device, compute_type):
+            if device == 'cpu':
+                model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                     cpu_threads=self.cpu_threads, num_workers=self.cpu_workers)
+            else:
+                model = WhisperModel(model_name, device=device, compute_type=compute_type)
+            self.root.after(0, show_warm_up)
+            self._warm_up(model)
+            return model
         
         def load_model():
+            load_device, load_compute_type = device, compute_type
+            fallback_note = ""
             try:
-                self.model = whisper.load_model(model_name)
-                self.current_model_name = model_name
-                self.root.after(0, lambda: self.model_status_label.config(
-                    text=f"Model Status: {model_name} loaded ✓", foreground='green'))
-                self.root.after(0, lambda: self.log(f"{model_name} model loaded successfully"))
+                try:
+                    model = create_model(load_device, load_compute_type)
+                except Exception as e:
+                    if load_device != 'cuda':
+                        raise
+                    # A CUDA device without usable cuBLAS/cuDNN libraries fails here
+                    self.log(f"CUDA model load failed, falling back to CPU: {str(e)}", level='warning')
+                    load_device, load_compute_type = 'cpu', 'int8'
+                    fallback_note = " - CUDA unavailable, using CPU"
+                    self.root.after(0, self._fall_back_to_cpu)
+                    model = create_model(load_device, load_compute_type)
+                
+                with self._model_cache_lock:
+                    self._model_cache[(model_name, load_device, load_compute_type)] = model
+                    while len(self._model_cache) > self.model_cache_size:
+                        self._model_cache.popitem(last=False)
+                self.log(f"{model_name} model loaded successfully")
+                
+                def finish_load():
+                    if generation != self._model_load_generation:
+                        return
+                    self._bind_model(model, model_name, selected_compute_type, load_compute_type)
+                    self.model_status_label.config(
+                        text=f"Model Status: {model_name} loaded ✓ "
+                             f"({load_device}, {load_compute_type}){fallback_note}",
+                        foreground='green')
+                
+                self.root.after(0, finish_load)
             except Exception as e:
-                self.root.after(0, lambda: self.model_status_label.config(
-                    text=f"Model Status: Error loading {model_name}", foreground='red'))
-                self.root.after(0, lambda: self.log(f"Error loading model: {str(e)}", level='error'))
+                self.log(f"Error loading model: {str(e)}", level='error')
+                
+                def fail_load():
+                    if generation == self._model_load_generation:
+                        self.model_status_label.config(
+                            text=f"Model Status: Error loading {model_name}", foreground='red')
+                
+                self.root.after(0, fail_load)
         
         thread = threading.Thread(target=load_model, daemon=True)
         thread.start()
     
+    def _fall_back_to_cpu(self):
+        """Switch the app to CPU int8 after CUDA failed to load a model"""
+        if self.device == 'cpu':
+            return
+        self.device, self.auto_compute_type = 'cpu', 'int8'
+        
+        choices = self._compute_type_choices()
+        self.compute_combo.config(values=choices)
+        if self.compute_type_var.get() not in choices:
+            self.compute_type_var.set('auto')
+        self.update_memory_estimate()
+    
+    def _resolve_compute_type(self, selected_compute_type):
+        """Map the Quantization selection to a CTranslate2 compute type"""
+        if selected_compute_type == 'auto':
+            return self.auto_compute_type
+        return selected_compute_type
+    
+    def _compute_type_choices(self):
+        """Quantization options: 'auto' plus the compute types CTranslate2 supports on this device"""
+        try:
+            supported = ctranslate2.get_supported_compute_types(self.device)
+        except RuntimeError:
+            supported = {'float32'}
+        return ['auto'] + [compute_type for compute_type in self.COMPUTE_TYPE_ORDER
+                           if compute_type in supported]
+    
+    def update_memory_estimate(self):
+        """Show the approximate weight memory for the selected model and quantization"""
+        compute_type = self._resolve_compute_type(self.compute_type_var.get())
+        # Mixed int8 types keep weights in int8; only activations use the float type
+        if compute_type.startswith('int8'):
+            weight_type = 'int8'
+        elif compute_type in ('int16', 'bfloat16'):
+            weight_type = 'float16'
+        else:
+            weight_type = compute_type
+        size_mb = self.MODEL_WEIGHT_MB.get(self.model_var.get(), {}).get(weight_type)
+        
+        if size_mb is None:
+            self.memory_estimate_label.config(text="")
+        else:
+            memory = 'VRAM' if self.device == 'cuda' else 'RAM'
+            self.memory_estimate_label.config(text=f"≈ {size_mb} MB {memory}")
+    
+    @staticmethod
+    def _warm_up(model):
+        """Run a short silent clip through the model so the first real request
+        does not pay for device and kernel initialization"""
+        silence = np.zeros(16000, dtype=np.float32)
+        segments, _ = model.transcribe(silence, language='en', vad_filter=False)
+        for _ in segments:
+            pass
+    
+    def _bind_model(self, model, model_name, selected_compute_type, compute_type):
+        """Make a loaded model the active one for transcription"""
+        self.model = model
+        self.batched = BatchedInferencePipeline(model=model)
+        self.current_model_name = model_name
+        self.current_compute_type = selected_compute_type
+        self.loaded_compute_type = compute_type
+    
     def process_single_file(self):
         """Process single audio file"""
         if not self.single_file_var.get():
@@ -381,13 +690,15 @@ class WhisperDesktopApp:
             return
         
         self.processing = True
+        self._cancel.clear()
         self.single_process_btn.config(state='disabled')
         self.single_preview.delete(1.0, tk.END)
         
-        thread = threading.Thread(target=self._process_single_thread, daemon=True)
+        run = self._capture_run_options()
+        thread = threading.Thread(target=self._process_single_thread, args=(run,), daemon=True)
         thread.start()
     
-    def _process_single_thread(self):
+    def _process_single_thread(self, run):
         """Background thread for single file processing"""
         try:
             audio_file = self.single_file_var.get()
@@ -400,15 +711,7 @@ class WhisperDesktopApp:
             os.makedirs(output_dir, exist_ok=True)
             
             # Transcribe
-            language = None if self.language_var.get() == 'auto' else self.language_var.get()
-            
-            result = self.model.transcribe(
-                audio_file,
-                language=language,
-                task=self.task_var.get(),
-                word_timestamps=self.word_timestamps_var.get(),
-                verbose=False
-            )
+            result = self._transcribe_cached(audio_file, lambda: self._prepare_input(audio_file, run), run)
             
             # Generate output filename
             base_name = Path(audio_file).stem
@@ -433,13 +736,15 @@ class WhisperDesktopApp:
             self.root.after(0, lambda: messagebox.showerror("Error", f"Processing failed:\n{str(e)}"))
         
         finally:
+            self._save_hash_index()
+            self._prune_result_cache()
             self.processing = False
             self.root.after(0, lambda: self.single_process_btn.config(state='normal'))
             self.update_progress(0)
     
     def process_batch_files(self):
         """Process all files in batch queue"""
-        if not self.audio_files:
+        if not self._files['path']:
             messagebox.showwarning("No Files", "Please add audio files to the batch queue first")
             return
         
@@ -451,65 +756,440 @@ class WhisperDesktopApp:
             messagebox.showwarning("Processing", "Already processing. Please wait.")
             return
         
+        try:
+            batch_size = max(1, self.batch_size_var.get())
+        except tk.TclError:
+            messagebox.showwarning("Invalid Batch Size", "Please enter a whole number for the batch size")
+            return
+        self.batch_size_var.set(batch_size)
+        
         self.processing = True
-        self.batch_process_btn.config(state='disabled')
+        self._cancel.clear()
+        self._set_batch_controls_state('disabled')
+        self.batch_stop_btn.config(state='normal')
         
-        thread = threading.Thread(target=self._process_batch_thread, daemon=True)
+        # The run works on a snapshot, so list edits cannot shift indexes under it
+        paths = list(self._files['path'])
+        durations = list(self._files['duration'])
+        
+        run = self._capture_run_options(batch_size)
+        thread = threading.Thread(target=self._process_batch_thread,
+                                  args=(paths, durations, run), daemon=True)
         thread.start()
     
-    def _process_batch_thread(self):
+    def _set_batch_controls_state(self, state):
+        """Enable or disable the controls that start a batch or edit its file list"""
+        for button in (self.batch_process_btn, self.add_files_btn,
+                       self.add_folder_btn, self.clear_btn):
+            button.config(state=state)
+    
+    def _process_batch_thread(self, paths, durations, run):
         """Background thread for batch processing"""
-        output_dir = self.batch_output_var.get()
-        os.makedirs(output_dir, exist_ok=True)
-        
-        total_files = len(self.audio_files)
-        language = None if self.language_var.get() == 'auto' else self.language_var.get()
-        
-        for idx, audio_file in enumerate(self.audio_files, 1):
-            try:
-                base_name = os.path.basename(audio_file)
-                self.update_status(f"Processing {idx}/{total_files}: {base_name}")
-                self.log(f"[{idx}/{total_files}] Processing: {base_name}")
-                
-                # Update tree view status
-                self.update_batch_tree_status(idx-1, "Processing...")
-                
-                # Transcribe
-                result = self.model.transcribe(
-                    audio_file,
-                    language=language,
-                    task=self.task_var.get(),
-                    word_timestamps=self.word_timestamps_var.get(),
-                    verbose=False
-                )
+        try:
+            output_dir = self.batch_output_var.get()
+            os.makedirs(output_dir, exist_ok=True)
+            
+            total_files = len(paths)
+            
+            # Probe durations not read by an earlier run; the list is locked while processing
+            if None in durations:
+                self.update_status("Reading audio durations...")
+                for index, duration in enumerate(durations):
+                    if duration is None:
+                        durations[index] = self._probe_duration(paths[index])
+                        self._files['duration'][index] = durations[index]
+            
+            # Shortest files first, so neighbouring files have similar lengths;
+            # files whose duration could not be read go last
+            order = sorted(range(total_files),
+                           key=lambda index: (durations[index] <= 0, durations[index]))
+            weights = self._progress_weights(durations)
+            
+            if self.device == 'cuda':
+                self._pipelined_batch(paths, order, weights, output_dir, run)
+            else:
+                self._parallel_cpu_batch(paths, order, weights, output_dir, run)
+            
+            if self._cancel.is_set():
+                completed = self._files['status'].count("✓ Complete")
+                self.update_status(f"Batch processing stopped after {completed}/{total_files} files")
+                self.log(f"Batch processing stopped. Output saved to: {output_dir}", level='warning')
                 
-                # Save outputs
-                file_stem = Path(audio_file).stem
-                self.save_transcription(result, output_dir, file_stem)
+                self.root.after(0, lambda: messagebox.showinfo(
+                    "Batch Stopped", 
+                    f"Processed {completed} of {total_files} files\nOutput saved to:\n{output_dir}"
+                ))
+            else:
+                self.update_status(f"Batch processing complete! Processed {total_files} files")
+                self.log(f"Batch processing complete. Output saved to: {output_dir}")
                 
-                # Update tree view status
-                self.update_batch_tree_status(idx-1, "✓ Complete")
-                self.log(f"[{idx}/{total_files}] Completed: {base_name}")
+                self.root.after(0, lambda: messagebox.showinfo(
+                    "Batch Complete", 
+                    f"Processed {total_files} files\nOutput saved to:\n{output_dir}"
+                ))
+            
+        except Exception as e:
+            self.log(f"Batch processing failed: {str(e)}", level='error')
+            self.update_status("Batch processing failed")
+        
+        finally:
+            self._save_hash_index()
+            self._prune_result_cache()
+            self.processing = False
+            self.root.after(0, lambda: self._set_batch_controls_state('normal'))
+            self.root.after(0, lambda: self.batch_stop_btn.config(state='disabled'))
+            self.update_progress(0)
+    
+    def stop_processing(self):
+        """Ask the running batch to stop after the files in progress"""
+        if self.processing and not self._cancel.is_set():
+            self._cancel.set()
+            self.batch_stop_btn.config(state='disabled')
+            self.log("Stopping batch processing...", level='warning')
+    
+    @staticmethod
+    def _progress_weights(durations):
+        """Per-file progress weights by audio duration; unknown durations count as the mean"""
+        known = [duration for duration in durations if duration > 0]
+        fallback = sum(known) / len(known) if known else 1.0
+        return [duration if duration > 0 else fallback for duration in durations]
+    
+    def _pipelined_batch(self, paths, order, weights, output_dir, run):
+        """Transcribe batch files on the GPU while the next files decode on the CPU"""
+        total_files = len(order)
+        total_weight = sum(weights)
+        done_weight = 0.0
+        lookahead = 2
+        
+        with ThreadPoolExecutor(max_workers=lookahead) as executor:
+            pending = deque(executor.submit(self._prepare_input, paths[index], run)
+                            for index in order[:lookahead])
+            
+            for position, index in enumerate(order, 1):
+                if self._cancel.is_set():
+                    for audio_future in pending:
+                        audio_future.cancel()
+                    for remaining in order[position - 1:]:
+                        self.update_batch_tree_status(remaining, "Cancelled")
+                    break
                 
-                # Update progress
-                progress = (idx / total_files) * 100
-                self.update_progress(progress)
+                audio_future = pending.popleft()
+                next_position = position - 1 + lookahead
+                if next_position < total_files:
+                    pending.append(executor.submit(self._prepare_input, paths[order[next_position]], run))
                 
-            except Exception as e:
-                self.log(f"Error processing {base_name}: {str(e)}", level='error')
-                self.update_batch_tree_status(idx-1, "✗ Failed")
+                self._process_batch_file(paths[index], index, position, total_files, audio_future.result,
+                                         output_dir, run)
+                done_weight += weights[index]
+                self.update_progress((done_weight / total_weight) * 100)
+    
+    def _parallel_cpu_batch(self, paths, order, weights, output_dir, run):
+        """Transcribe batch files concurrently, one file per CPU model worker"""
+        total_files = len(order)
+        total_weight = sum(weights)
+        done_weight = 0.0
+        
+        with ThreadPoolExecutor(max_workers=self.cpu_workers) as executor:
+            futures = {
+                executor.submit(self._process_batch_file, paths[index], index, position, total_files,
+                                lambda path=paths[index]: self._prepare_input(path, run),
+                                output_dir, run): index
+                for position, index in enumerate(order, 1)
+            }
+            
+            for future in as_completed(futures):
+                done_weight += weights[futures[future]]
+                self.update_progress((done_weight / total_weight) * 100)
+    
+    def _process_batch_file(self, audio_file, index, position, total_files, prepare,
+                            output_dir, run):
+        """Transcribe and save one batch file, reporting status in the tree and log"""
+        base_name = os.path.basename(audio_file)
+        if self._cancel.is_set():
+            self.update_batch_tree_status(index, "Cancelled")
+            return
         
-        self.update_status(f"Batch processing complete! Processed {total_files} files")
-        self.log(f"Batch processing complete. Output saved to: {output_dir}")
+        try:
+            self.update_status(f"Processing {position}/{total_files}: {base_name}")
+            self.log(f"[{position}/{total_files}] Processing: {base_name}")
+            
+            # Update tree view status
+            self.update_batch_tree_status(index, "Processing...")
+            
+            # Transcribe
+            result = self._transcribe_cached(audio_file, prepare, run)
+            
+            # Save outputs
+            file_stem = Path(audio_file).stem
+            self.save_transcription(result, output_dir, file_stem)
+            
+            # Update tree view status
+            self.update_batch_tree_status(index, "✓ Complete")
+            self.log(f"[{position}/{total_files}] Completed: {base_name}")
+            
+        except TranscriptionCancelled:
+            self.log(f"[{position}/{total_files}] Cancelled: {base_name}", level='warning')
+            self.update_batch_tree_status(index, "Cancelled")
+            
+        except Exception as e:
+            self.log(f"Error processing {base_name}: {str(e)}", level='error')
+            self.update_batch_tree_status(index, "✗ Failed")
+    
+    @staticmethod
+    def _load_audio(audio_file, sampling_rate=16000, max_read_samples=32 * 1024 * 1024):
+        """Decode an audio file to 16 kHz mono float32 samples without spawning ffmpeg
+        
+        soundfile reads the whole file at its native rate before resampling, so it is
+        only used while that buffer stays under max_read_samples (128 MB of float32).
+        Longer files and formats libsndfile cannot read (m4a, wma, ...) go through
+        PyAV's in-process decoder, which resamples in chunks as it streams.
+        """
+        try:
+            info = sf.info(audio_file)
+        except RuntimeError:
+            return decode_audio(audio_file, sampling_rate=sampling_rate)
+        
+        if info.frames * info.channels > max_read_samples:
+            return decode_audio(audio_file, sampling_rate=sampling_rate)
+        
+        audio, file_rate = sf.read(audio_file, dtype='float32', always_2d=True)
+        audio = audio.mean(axis=1)
+        if file_rate != sampling_rate:
+            divisor = gcd(sampling_rate, file_rate)
+            audio = resample_poly(audio, sampling_rate // divisor, file_rate // divisor)
+        return audio.astype(np.float32, copy=False)
+    
+    def _capture_run_options(self, batch_size=None):
+        """Snapshot the active model and transcription options for one run
+        
+        Taken on the Tk thread, so the model and the cache key stay consistent even
+        if the user switches models while the run is in progress. On GPU, passing
+        batch_size selects the BatchedInferencePipeline, which decodes the audio's
+        30-second chunks in batched encoder/decoder passes.
+        """
+        batched = batch_size is not None and self.device == 'cuda'
+        return {
+            'model': self.batched if batched else self.model,
+            'pipeline': 'batched' if batched else 'sequential',
+            'batch_size': batch_size,
+            'model_name': self.current_model_name,
+            'compute_type': self.loaded_compute_type,
+            'language': None if self.language_var.get() == 'auto' else self.language_var.get(),
+            'task': self.task_var.get(),
+            'word_timestamps': self.word_timestamps_var.get()
+        }
+    
+    def _prepare_input(self, audio_file, run):
+        """Look up the cached result for a file, decoding its audio only on a miss
         
-        self.root.after(0, lambda: messagebox.showinfo(
-            "Batch Complete", 
-            f"Processed {total_files} files\nOutput saved to:\n{output_dir}"
-        ))
+        Returns (cache_key, cached_result, audio); exactly one of the last two is set.
+        """
+        cache_key = self._result_cache_key(audio_file, run)
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # Mark the entry as recently used so the size cap evicts it last
+            os.utime(cache_file)
+            return cache_key, result, None
+        except (OSError, ValueError):
+            pass
+        return cache_key, None, self._load_audio(audio_file)
+    
+    def _transcribe_cached(self, audio_file, prepare, run):
+        """Return the cached result for this audio and these options, or transcribe and cache it"""
+        cache_key, result, audio = prepare()
+        if result is not None:
+            self.log(f"Using cached transcription for {os.path.basename(audio_file)}")
+            return result
         
-        self.processing = False
-        self.root.after(0, lambda: self.batch_process_btn.config(state='normal'))
-        self.update_progress(0)
+        result = self._transcribe(audio, run)
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            self.log(f"Could not cache transcription: {str(e)}", level='warning')
+        
+        return result
+    
+    def _result_cache_key(self, audio_file, run):
+        """Cache key from the audio content hash, model and transcription options"""
+        options = [
+            self.RESULT_CACHE_VERSION,
+            self._file_digest(audio_file)[:16],
+            run['model_name'],
+            run['compute_type'],
+            # The batched pipeline filters with VAD, so its segmentation differs
+            run['pipeline'],
+            run['language'],
+            run['task'],
+            run['word_timestamps']
+        ]
+        return hashlib.sha256(json.dumps(options).encode('utf-8')).hexdigest()[:32]
+    
+    def _file_digest(self, audio_file):
+        """SHA-256 of the file contents, reused while its mtime and size are unchanged"""
+        stat = os.stat(audio_file)
+        
+        with self._cache_lock:
+            if self._hash_index is None:
+                try:
+                    with open(self.cache_dir / "hashes.json", 'r', encoding='utf-8') as f:
+                        self._hash_index = json.load(f)
+                except (OSError, ValueError):
+                    self._hash_index = {}
+            
+            entry = self._hash_index.get(audio_file)
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                return entry['sha256']
+        
+        digest = hashlib.sha256()
+        with open(audio_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(4 * 1024 * 1024), b''):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        
+        with self._cache_lock:
+            self._hash_index[audio_file] = {
+                'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': sha256
+            }
+            self._hash_index_dirty = True
+        
+        return sha256
+    
+    def _save_hash_index(self):
+        """Write the audio hash index once per run, dropping files that no longer exist"""
+        with self._cache_lock:
+            if self._hash_index is None:
+                return
+            missing = [path for path in self._hash_index if not os.path.exists(path)]
+            for path in missing:
+                del self._hash_index[path]
+            if not (self._hash_index_dirty or missing):
+                return
+            index_file = self.cache_dir / "hashes.json"
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                temp_file = index_file.with_suffix(".tmp")
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self._hash_index, f)
+                os.replace(temp_file, index_file)
+                self._hash_index_dirty = False
+            except OSError as e:
+                self.log(f"Could not save audio hash index: {str(e)}", level='warning')
+    
+    def _cached_result_files(self):
+        """(mtime, size, path) of every cached transcription result"""
+        files = []
+        try:
+            entries = os.scandir(self.cache_dir)
+        except OSError:
+            return files
+        with entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.name != "hashes.json":
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+    
+    def _prune_result_cache(self):
+        """Delete the least recently used cached results beyond result_cache_max_mb"""
+        files = self._cached_result_files()
+        total = sum(size for _, size, _ in files)
+        limit = self.result_cache_max_mb * 1024 * 1024
+        
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+    
+    def clear_result_cache(self):
+        """Delete all cached transcriptions and the audio hash index"""
+        if self.processing:
+            messagebox.showwarning("Processing", "Cannot clear the cache while processing. Please wait.")
+            return
+        
+        files = self._cached_result_files()
+        if not messagebox.askyesno(
+            "Clear Cache",
+            f"Delete {len(files)} cached transcriptions "
+            f"({sum(size for _, size, _ in files) / (1024 * 1024):.1f} MB)?"
+        ):
+            return
+        
+        removed = 0
+        with self._cache_lock:
+            for _, _, path in files:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            try:
+                os.remove(self.cache_dir / "hashes.json")
+            except OSError:
+                pass
+            self._hash_index = {}
+            self._hash_index_dirty = False
+        
+        self.log(f"Cleared {removed} cached transcriptions")
+    
+    def _transcribe(self, audio, run):
+        """Transcribe audio with the run's model and return a whisper-style result dict"""
+        options = {
+            'language': run['language'],
+            'task': run['task'],
+            'word_timestamps': run['word_timestamps']
+        }
+        
+        if run['pipeline'] == 'batched':
+            # The batched pipeline defaults to one segment per VAD chunk (up to 30 s),
+            # which is far too long for subtitle cues
+            segments, info = run['model'].transcribe(audio, batch_size=run['batch_size'],
+                                                     without_timestamps=False, **options)
+        else:
+            segments, info = run['model'].transcribe(audio, **options)
+        return self._build_result(segments, info)
+    
+    def _build_result(self, segments, info):
+        """Collect faster-whisper segments into the dict layout used by the save functions"""
+        result_segments = []
+        for segment in segments:
+            # Segments are decoded lazily, so stopping here halts the model mid-file
+            if self._cancel.is_set():
+                raise TranscriptionCancelled()
+            
+            entry = {
+                'id': segment.id,
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text
+            }
+            if segment.words:
+                entry['words'] = [
+                    {'word': word.word, 'start': word.start, 'end': word.end,
+                     'probability': word.probability}
+                    for word in segment.words
+                ]
+            result_segments.append(entry)
+        
+        return {
+            'text': ''.join(segment['text'] for segment in result_segments),
+            'segments': result_segments,
+            'language': info.language
+        }
     
     def save_transcription(self, result, output_dir, base_name):
         """Save transcription in requested formats"""
@@ -539,70 +1219,71 @@ class WhisperDesktopApp:
     def save_as_json(self, result, output_dir, base_name):
         """Save as JSON"""
         output_file = os.path.join(output_dir, f"{base_name}.json")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
     
     def save_as_srt(self, result, output_dir, base_name):
         """Save as SRT subtitle format"""
         output_file = os.path.join(output_dir, f"{base_name}.srt")
+        srt = self.format_timestamp_srt
+        parts = [
+            f"{i}\n{srt(segment['start'])} --> {srt(segment['end'])}\n{segment['text'].strip()}\n\n"
+            for i, segment in enumerate(result['segments'], 1)
+        ]
         with open(output_file, 'w', encoding='utf-8') as f:
-            for i, segment in enumerate(result['segments'], 1):
-                start = self.format_timestamp_srt(segment['start'])
-                end = self.format_timestamp_srt(segment['end'])
-                f.write(f"{i}\n")
-                f.write(f"{start} --> {end}\n")
-                f.write(f"{segment['text'].strip()}\n\n")
+            f.write("".join(parts))
     
     def save_as_vtt(self, result, output_dir, base_name):
         """Save as WebVTT format"""
         output_file = os.path.join(output_dir, f"{base_name}.vtt")
+        vtt = self.format_timestamp_vtt
+        parts = ["WEBVTT\n\n"]
+        parts.extend(
+            f"{vtt(segment['start'])} --> {vtt(segment['end'])}\n{segment['text'].strip()}\n\n"
+            for segment in result['segments']
+        )
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("WEBVTT\n\n")
-            for segment in result['segments']:
-                start = self.format_timestamp_vtt(segment['start'])
-                end = self.format_timestamp_vtt(segment['end'])
-                f.write(f"{start} --> {end}\n")
-                f.write(f"{segment['text'].strip()}\n\n")
+            f.write("".join(parts))
     
     @staticmethod
     def format_timestamp_srt(seconds):
         """Format timestamp for SRT format"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+        ms = int(seconds * 1000)
+        hours, ms = divmod(ms, 3_600_000)
+        minutes, ms = divmod(ms, 60_000)
+        secs, ms = divmod(ms, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d},{ms:03d}"
     
     @staticmethod
     def format_timestamp_vtt(seconds):
         """Format timestamp for VTT format"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+        ms = int(seconds * 1000)
+        hours, ms = divmod(ms, 3_600_000)
+        minutes, ms = divmod(ms, 60_000)
+        secs, ms = divmod(ms, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{ms:03d}"
     
     # UI Update Methods
     
     def update_status(self, message):
         """Update status label"""
-        self.root.after(0, lambda: self.status_var.set(message))
+        self._ui_queue.put(('status', message))
     
     def update_progress(self, value):
         """Update progress bar"""
-        self.root.after(0, lambda: self.progress_var.set(value))
+        self._ui_queue.put(('progress', value))
     
     def update_batch_tree_status(self, index, status):
         """Update status in batch tree view"""
-        def update():
-            items = self.batch_tree.get_children()
-            if index < len(items):
-                item = items[index]
-                values = list(self.batch_tree.item(item, 'values'))
-                values[2] = status
-                self.batch_tree.item(item, values=values)
+        statuses = self._files['status']
+        if index < len(statuses):
+            statuses[index] = status
         
-        self.root.after(0, update)
+        self._ui_queue.put(('tree', (index, status)))
     
     def log(self, message, level='info'):
         """Add message to console log"""
@@ -615,13 +1296,52 @@ class WhisperDesktopApp:
         else:
             prefix = "ℹ️  INFO"
         
-        log_message = f"[{timestamp}] {prefix}: {message}\n"
-        
-        def append_log():
-            self.console.insert(tk.END, log_message)
-            self.console.see(tk.END)
+        self._ui_queue.put(('log', f"[{timestamp}] {prefix}: {message}\n"))
+    
+    def _drain_ui(self):
+        """Apply queued widget updates on the Tk thread, then reschedule"""
+        try:
+            log_lines = []
+            tree_items = None
+            
+            for _ in range(self.ui_drain_limit):
+                try:
+                    kind, payload = self._ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                
+                if kind == 'log':
+                    log_lines.append(payload)
+                elif kind == 'status':
+                    self.status_var.set(payload)
+                elif kind == 'progress':
+                    self.progress_var.set(payload)
+                elif kind == 'tree':
+                    index, status = payload
+                    if tree_items is None:
+                        tree_items = self.batch_tree.get_children()
+                    if index < len(tree_items):
+                        item = tree_items[index]
+                        values = list(self.batch_tree.item(item, 'values'))
+                        values[2] = status
+                        self.batch_tree.item(item, values=values)
+            
+            if log_lines:
+                text = "".join(log_lines)
+                self._console_lines += text.count("\n")
+                excess = self._console_lines - self.console_max_lines
+                
+                self.console.configure(state='normal')
+                self.console.insert(tk.END, text)
+                if excess > 0:
+                    self.console.delete('1.0', f'{excess + 1}.0')
+                    self._console_lines -= excess
+                self.console.configure(state='disabled')
+                self.console.see(tk.END)
         
-        self.root.after(0, append_log)
+        finally:
+            # Reschedule even if a widget update raised, so later updates still apply
+            self.root.after(self.ui_drain_interval_ms, self._drain_ui)
 
 
 def main():